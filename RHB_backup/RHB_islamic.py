@@ -1,11 +1,27 @@
 # rhb_adapter.py
 import re
 import datetime
+from bisect import bisect_left
+from functools import partial
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+from page_pool import map_page_ranges, page_workers
+from pdf_pages import page_words, pdf_to_bytes
+from statement_text import DROP_COMMAS
 
 BANK_NAME = "RHB Bank"
 
-date_re = re.compile(r"^(\d{2})\s+([A-Za-z]{3})")
-num_re = re.compile(r"\d[\d,]*\.\d{2}")
+# Statements are ASCII: re.ASCII keeps \d / \s off the Unicode tables
+date_re = re.compile(r"^(\d{2})\s+([A-Za-z]{3})", re.ASCII)
+num_re = re.compile(r"\d[\d,]*\.\d{2}", re.ASCII)
+# Statement period header "01 Jan 24 – 31 Jan 24": two-digit year
+year_re = re.compile(r"\d{1,2}\s+[A-Za-z]{3}\s+(\d{2})\s*[–-]")
+
+# Words whose tops are within this many points share a visual line
+LINE_Y_TOLERANCE = 3
 
 SUMMARY_KEYWORDS = [
     "B/F BALANCE",
@@ -21,18 +37,49 @@ SUMMARY_KEYWORDS = [
 ]
 
 
+# One alternation scan; IGNORECASE avoids an upper() copy per line
+SUMMARY_RE = re.compile(
+    "|".join(re.escape(k) for k in SUMMARY_KEYWORDS), re.IGNORECASE
+)
+
+
 def is_summary_row(text: str) -> bool:
-    text = text.upper()
-    return any(k in text for k in SUMMARY_KEYWORDS)
+    return SUMMARY_RE.search(text) is not None
+
+
+# "%b" month names → numbers: a dict lookup and date() stand in for
+# strptime's format parsing on every transaction
+MONTHS = {
+    m: i for i, m in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+         "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1
+    )
+}
+
+
+def tx_iso_date(day, mon, year):
+    try:
+        return datetime.date(year, MONTHS[mon.title()], int(day)).isoformat()
+    except (KeyError, ValueError):
+        return f"{day} {mon} {year}"
+
+
+# -------------------------------------------------
+# Page access: pdfplumber or PyMuPDF (fitz)
+# -------------------------------------------------
+def page_text(page):
+    if isinstance(page, fitz.Page):
+        return page.get_text() or ""
+    return page.extract_text_simple() or ""
 
 
 # -------------------------------------------------
 # Detect column X ranges from header
 # -------------------------------------------------
-def detect_columns(page):
+def detect_columns(words):
     debit_x = credit_x = balance_x = None
 
-    for w in page.extract_words():
+    for w in words:
         t = w["text"].lower()
         if t == "debit":
             debit_x = (w["x0"] - 20, w["x1"] + 60)
@@ -45,140 +92,288 @@ def detect_columns(page):
 
 
 # -------------------------------------------------
-# MAIN PARSER
+# Group words into visual lines by Y coordinate
+# -------------------------------------------------
+def group_words_by_line(words):
+    """
+    Yield line_words in reading order, each sorted by x0.
+    Words are swept in top order and a new line starts once a word
+    sits more than LINE_Y_TOLERANCE below the line's first word, so
+    amounts printed slightly off the date's baseline stay on its row.
+    Each word lands in exactly one line; lines are streamed, so no
+    page-wide list of lines is built.
+    """
+    line_words = []
+    line_top = None
+    for w in sorted(words, key=lambda w: w["top"]):
+        if line_words and w["top"] - line_top > LINE_Y_TOLERANCE:
+            line_words.sort(key=lambda w: w["x0"])
+            yield line_words
+            line_words = []
+        if not line_words:
+            line_top = w["top"]
+        line_words.append(w)
+    if line_words:
+        line_words.sort(key=lambda w: w["x0"])
+        yield line_words
+
+
+# -------------------------------------------------
+# Column lookup: sorted X edges → column kind
+# -------------------------------------------------
+def build_column_index(debit_x, credit_x):
+    """
+    Flatten the debit/credit ranges into sorted edges so a number's
+    x_mid is classified with one bisect instead of range checks.
+    Slot 2*i is the gap below edges[i] and slot 2*i + 1 is edges[i]
+    itself. Each slot gets the kind the range checks give it, so
+    edges stay inclusive and debit wins where the ranges overlap.
+    """
+    def kind_at(x):
+        if debit_x and debit_x[0] <= x <= debit_x[1]:
+            return "debit"
+        if credit_x and credit_x[0] <= x <= credit_x[1]:
+            return "credit"
+        return None
+
+    edges = sorted({x for r in (debit_x, credit_x) if r for x in r})
+
+    kind_by_slot = {}
+    for i, edge in enumerate(edges):
+        if i:
+            kind_by_slot[2 * i] = kind_at((edges[i - 1] + edge) / 2)
+        kind_by_slot[2 * i + 1] = kind_at(edge)
+
+    return edges, kind_by_slot
+
+
+# -------------------------------------------------
+# Classify a row's amounts → (debit, credit, balance)
+# -------------------------------------------------
+def classify_amounts(nums, edges, kind_by_slot):
+    """
+    Pure numeric step of the row parser: the rightmost number is
+    the balance, the rest are placed by X-axis column. All in cents.
+    nums holds (x0, x1, cents) tuples, so a plain sort orders by x0.
+    """
+    debit = credit = 0
+    balance = None
+
+    if not nums:
+        return debit, credit, balance
+
+    nums.sort()
+    balance = nums[-1][2]
+
+    for x0, x1, cents in nums[:-1]:
+        x_mid = (x0 + x1) / 2
+        i = bisect_left(edges, x_mid)
+        on_edge = i < len(edges) and edges[i] == x_mid
+        kind = kind_by_slot.get(2 * i + on_edge)
+        if kind == "debit":
+            debit = cents
+        elif kind == "credit":
+            credit = cents
+
+    return debit, credit, balance
+
+
+# -------------------------------------------------
+# Per-page rows (no cross-page state)
+# -------------------------------------------------
+def parse_page_rows(words, page_no, year, edges, kind_by_slot):
+    """
+    Transaction rows of one page with column-based debit/credit.
+    The balance-difference correction needs the previous row, so it
+    is left to reconcile_rows() and pages can be parsed independently.
+    Rows are (date, description, debit, credit, balance, page) tuples:
+    they never leave this module and are pickled back from workers.
+    """
+    rows = []
+    # Bound once: the loop body below runs for every visual line
+    match_date = date_re.match
+    strip_amounts = num_re.sub
+
+    for line_words in group_words_by_line(words):
+
+        # Rows start with a two-digit day word (date_re needs "DD" then
+        # whitespace); headers, notes, amounts and page numbers fail
+        # here, before any join or regex call
+        first = line_words[0]["text"]
+        if len(first) != 2 or not first.isdigit():
+            continue
+        line = " ".join(w["text"] for w in line_words)
+
+        # Anchored "DD Mon" match: amounts or page numbers that
+        # start with a digit still fail here
+        dm = match_date(line)
+        if not dm:
+            continue
+
+        # Skip non-transaction rows
+        if is_summary_row(line):
+            continue
+
+        # ==============================
+        # DATE LINE → new transaction
+        # ==============================
+        tx_date = tx_iso_date(*dm.groups(), year)
+
+        nums = []
+        for w in line_words:
+            txt = w["text"].translate(DROP_COMMAS)
+            # Same as num_re.fullmatch on "1234.56", without the regex
+            # engine: digits, ".", exactly two decimal digits
+            if (
+                len(txt) >= 4 and txt[-3] == "."
+                and txt[:-3].isdecimal() and txt[-2:].isdecimal()
+            ):
+                # Exactly two decimals → integer cents, no float drift
+                nums.append((w["x0"], w["x1"], int(txt[:-3] + txt[-2:])))
+
+        # Rightmost number = balance, rest by X-axis
+        debit, credit, balance = classify_amounts(nums, edges, kind_by_slot)
+
+        # -------------------------------------------------
+        # DESCRIPTION: FIRST LINE ONLY
+        # -------------------------------------------------
+        # date_re already matched the "DD Mon" prefix: slice it off
+        desc = strip_amounts("", line[dm.end():])
+
+        rows.append((
+            tx_date, " ".join(desc.split()), debit, credit, balance, page_no
+        ))
+
+    return rows
+
+
 # -------------------------------------------------
-def parse_transactions_rhb(pdf, source_file):
-    transactions = []
+# Sequential pass: balance difference is final authority
+# -------------------------------------------------
+def reconcile_rows(rows, source_file):
+    """
+    Rows carry integer cents; the diff is exact and amounts are
+    converted to 2-decimal floats only when the output is built.
+    Yields transactions one at a time, so `rows` may be lazy too.
+    """
     prev_balance = None
-    current = None
+
+    for date, description, debit, credit, balance, page in rows:
+
+        # 🔒 Final authority → balance difference
+        if prev_balance is not None and balance is not None:
+            diff = balance - prev_balance
+            if diff > 0:
+                credit = diff
+                debit = 0
+            elif diff < 0:
+                debit = -diff
+                credit = 0
+
+        yield {
+            "date": date,
+            "description": description,
+            "debit": debit / 100,
+            "credit": credit / 100,
+            "balance": balance / 100 if balance is not None else None,
+            "page": page,
+            "bank": BANK_NAME,
+            "source_file": source_file
+        }
+        prev_balance = balance
+
+
+# -------------------------------------------------
+# Parallel page parsing (process pool)
+# -------------------------------------------------
+def _parse_page_range(pdf_bytes, use_fitz, year, edges, kind_by_slot, page_numbers):
+    """
+    Worker: reopens the PDF from bytes once and parses its range
+    of 1-based pages.
+    """
+    if use_fitz:
+        pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+        pages = pdf
+    else:
+        pdf = pdfplumber.open(BytesIO(pdf_bytes))
+        pages = pdf.pages
+
+    try:
+        rows = []
+        for n in page_numbers:
+            rows.extend(
+                parse_page_rows(page_words(pages[n - 1]), n, year, edges, kind_by_slot)
+            )
+        return rows
+    finally:
+        pdf.close()
+
+
+def _parse_pages_parallel(pdf, page_count, workers, first_words, year, edges, kind_by_slot):
+    # Page 1's words are already extracted: parse them here and only
+    # hand pages 2..N to the workers
+    yield from parse_page_rows(first_words, 1, year, edges, kind_by_slot)
+
+    worker = partial(
+        _parse_page_range, pdf_to_bytes(pdf), isinstance(pdf, fitz.Document),
+        year, edges, kind_by_slot,
+    )
+    yield from map_page_ranges(worker, range(2, page_count + 1), workers)
+
+
+def _iter_page_rows(pages, first_words, year, edges, kind_by_slot):
+    for page_no, page in enumerate(pages, start=1):
+        words = first_words if page_no == 1 else page_words(page)
+        yield from parse_page_rows(words, page_no, year, edges, kind_by_slot)
+
+
+# -------------------------------------------------
+# MAIN PARSER
+# -------------------------------------------------
+def iter_transactions_rhb(pdf, source_file, workers=None):
+    """
+    `pdf` may be a pdfplumber PDF or an open fitz.Document;
+    the caller owns (and closes) either, after consuming the iterator.
+    Transactions are yielded page by page, never held as one list.
+    `workers` bounds the page_pool processes; workers=1 stays serial.
+    """
+    # -------------------------------------------------
+    # First page: extract once, reuse for header + loop
+    # -------------------------------------------------
+    pages = pdf if isinstance(pdf, fitz.Document) else pdf.pages
+    first_page = pages[0]
+    first_text = page_text(first_page)
+    first_words = page_words(first_page)
 
     # -------------------------------------------------
     # Detect YEAR from header
     # -------------------------------------------------
-    header_text = pdf.pages[0].extract_text() or ""
-    m = re.search(r"\d{1,2}\s+[A-Za-z]{3}\s+(\d{2})\s*[–-]", header_text)
+    m = year_re.search(first_text)
     year = int("20" + m.group(1)) if m else datetime.date.today().year
 
     # -------------------------------------------------
     # Detect column X positions
     # -------------------------------------------------
-    debit_x, credit_x, balance_x = detect_columns(pdf.pages[0])
+    debit_x, credit_x, balance_x = detect_columns(first_words)
+    # The balance needs no slot: it is the rightmost number on the row
+    edges, kind_by_slot = build_column_index(debit_x, credit_x)
 
     # -------------------------------------------------
     # Parse pages
     # -------------------------------------------------
-    for page_no, page in enumerate(pdf.pages, start=1):
-        text = page.extract_text() or ""
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        words = page.extract_words()
-
-        # Map line → words
-        line_words = {}
-        for w in words:
-            for line in lines:
-                if w["text"] in line:
-                    line_words.setdefault(line, []).append(w)
-                    break
-
-        for line in lines:
-
-            # Skip non-transaction rows
-            if is_summary_row(line):
-                continue
-
-            if any(h in line for h in [
-                "ACCOUNT ACTIVITY", "Date", "Tarikh",
-                "Debit", "Credit", "Balance",
-                "Page No", "Statement Period"
-            ]):
-                continue
-
-            dm = date_re.match(line)
-
-            # ==============================
-            # DATE LINE → new transaction
-            # ==============================
-            if dm:
-                if current:
-                    transactions.append(current)
-                    prev_balance = current["balance"]
-
-                day, mon = dm.groups()
-                try:
-                    tx_date = datetime.datetime.strptime(
-                        f"{day}{mon}{year}", "%d%b%Y"
-                    ).date().isoformat()
-                except:
-                    tx_date = f"{day} {mon} {year}"
-
-                debit = credit = 0.0
-                balance = None
-
-                nums = []
-                for w in line_words.get(line, []):
-                    txt = w["text"].replace(",", "")
-                    if num_re.fullmatch(txt):
-                        nums.append({
-                            "val": float(txt),
-                            "x": w["x0"],
-                            "x1": w["x1"]
-                        })
-
-                nums.sort(key=lambda x: x["x"])
-
-                # Rightmost number = balance
-                if nums:
-                    balance = nums[-1]["val"]
-                    txn_nums = nums[:-1]
-                else:
-                    txn_nums = []
-
-                # Assign by X-axis
-                for n in txn_nums:
-                    x_mid = (n["x"] + n["x1"]) / 2
-                    if debit_x and debit_x[0] <= x_mid <= debit_x[1]:
-                        debit = n["val"]
-                    elif credit_x and credit_x[0] <= x_mid <= credit_x[1]:
-                        credit = n["val"]
-
-                # 🔒 Final authority → balance difference
-                if prev_balance is not None and balance is not None:
-                    diff = round(balance - prev_balance, 2)
-                    if diff > 0:
-                        credit = diff
-                        debit = 0.0
-                    elif diff < 0:
-                        debit = abs(diff)
-                        credit = 0.0
-
-                # -------------------------------------------------
-                # DESCRIPTION: FIRST LINE ONLY
-                # -------------------------------------------------
-                desc = line
-                for a in num_re.findall(desc):
-                    desc = desc.replace(a, "")
-                desc = desc.replace(day, "").replace(mon, "").strip()
-
-                current = {
-                    "date": tx_date,
-                    "description": " ".join(desc.split()),
-                    "debit": round(debit, 2),
-                    "credit": round(credit, 2),
-                    "balance": round(balance, 2) if balance is not None else None,
-                    "page": page_no,
-                    "bank": BANK_NAME,
-                    "source_file": source_file
-                }
-
-            # ==============================
-            # CONTINUATION LINE → IGNORE
-            # ==============================
-            else:
-                continue
-
-        if current:
-            transactions.append(current)
-            prev_balance = current["balance"]
-            current = None
-
-    return transactions
+    page_count = len(pages)
+    workers = page_workers(page_count, workers)
+
+    if workers > 1:
+        rows = _parse_pages_parallel(
+            pdf, page_count, workers, first_words, year, edges, kind_by_slot
+        )
+    else:
+        rows = _iter_page_rows(pages, first_words, year, edges, kind_by_slot)
+
+    yield from reconcile_rows(rows, source_file)
+
+
+def parse_transactions_rhb(pdf, source_file, workers=None):
+    """List form of iter_transactions_rhb(), for existing callers."""
+    return list(iter_transactions_rhb(pdf, source_file, workers))
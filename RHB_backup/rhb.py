@@ -1,135 +1,221 @@
 import re
-import fitz
-from datetime import datetime
+from functools import partial
+from operator import itemgetter
 
+import fitz
 
-def parse_transactions_rhb(pdf_input, source_filename):
+from page_pool import map_page_ranges, page_workers
+from statement_text import DROP_COMMAS, norm_date
+
+# ---------------- REGEX ----------------
+# Compiled once at import rather than on every call
+DATE_RE = re.compile(r"^\d{2}-\d{2}-\d{4}$")
+MONEY_RE = re.compile(r"^\d{1,3}(?:,\d{3})*\.\d{2}[+-]?$")
+
+# Words are (y, x, text) tuples: a C-level key for x order
+BY_X = itemgetter(1)
+
+
+# ---------------- HELPERS ----------------
+def parse_cents(t: str) -> int:
+    """
+    MONEY_RE text → integer cents. Amounts always carry exactly two
+    decimals, so balance movement is exact integer arithmetic and
+    floats are only made for the output.
+    """
+    neg = t.endswith("-")
+    pos = t.endswith("+")
+    t = t[:-1] if neg or pos else t
+    v = int(t[:-3].translate(DROP_COMMAS) + t[-2:])
+    return -v if neg else v
+
+
+# ==========================================================
+# PER-PAGE ROWS (no cross-page state)
+# ==========================================================
+def parse_page_rows(words, page_number):
+    """
+    (date, description, balance cents, page) for each dated line of
+    one page. Debit/credit need the previous balance, so they are
+    worked out afterwards and pages can be parsed independently.
+    """
+    # (y, x, text) tuples straight from PyMuPDF's word tuples: a
+    # plain sort gives reading order, with no dict built per word
+    rows = [
+        (round(w[1], 1), w[0], w[4].strip())
+        for w in words if w[4].strip()
+    ]
+
+    rows.sort()
+    # y of the last date row kept, as in _reflex_page_rows() in the
+    # top-level rhb.py
+    last_y = None
+    page_rows = []
+
+    # rows are sorted by y, so the words within 1.5 of a date row
+    # form one contiguous run. Date rows come in increasing y and
+    # the run's start only moves forward: a sweep, not a rescan of
+    # the whole page for every date
+    n_rows = len(rows)
+    lo = 0
+
+    for y_key, _, date_text in rows:
+        if not DATE_RE.match(date_text):
+            continue
+
+        if y_key == last_y:
+            continue
+
+        date_iso = norm_date(date_text)
+
+        while rows[lo][0] < y_key and abs(rows[lo][0] - y_key) > 1.5:
+            lo += 1
+        hi = lo
+        while hi < n_rows and (
+            rows[hi][0] <= y_key or abs(rows[hi][0] - y_key) <= 1.5
+        ):
+            hi += 1
+
+        line = sorted(rows[lo:hi], key=BY_X)
+
+        description = []
+        # line runs left to right, so the last amount seen is the
+        # rightmost one (the balance): no list of amounts, no max()
+        balance_text = None
+
+        for w in line:
+            text = w[2]
+            if text == date_text:
+                continue
+            # Amounts always contain "."; most words never reach the regex
+            if "." in text and MONEY_RE.match(text):
+                balance_text = text
+            else:
+                if not text.isdigit():
+                    description.append(text)
+
+        if balance_text is None:
+            continue
+
+        balance = parse_cents(balance_text)
+
+        page_rows.append((
+            date_iso, " ".join(description)[:200], balance, page_number
+        ))
+        last_y = y_key
+
+    return page_rows
+
+
+def _parse_page_range(pdf_bytes, page_numbers):
+    # Worker: fitz pages don't pickle, so reopen the PDF from bytes
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        rows = []
+        for page_number in page_numbers:
+            words = doc[page_number - 1].get_text("words")
+            rows.extend(parse_page_rows(words, page_number))
+        return rows
+    finally:
+        doc.close()
+
+
+def parse_transactions_rhb(pdf_input, source_filename, workers=None):
+    """
+    `pdf_input` may be a path, raw PDF bytes, a pdfplumber PDF or an
+    already open fitz.Document; a passed-in Document is reused as is
+    and left open for the caller.
+    Long statements have pages 2..N parsed in up to `workers`
+    processes; see page_pool.page_workers.
+    """
     # ---------------- OPEN PDF (Streamlit-safe) ----------------
     def open_doc(inp):
+        if isinstance(inp, (bytes, bytearray)):
+            return fitz.open(stream=inp, filetype="pdf")
         if hasattr(inp, "stream"):
             inp.stream.seek(0)
             data = inp.stream.read()
             return fitz.open(stream=data, filetype="pdf")
         return fitz.open(inp)
 
-    doc = open_doc(pdf_input)
-
-    # ---------------- REGEX ----------------
-    DATE_RE = re.compile(r"^\d{2}-\d{2}-\d{4}$")
-    MONEY_RE = re.compile(r"^\d{1,3}(?:,\d{3})*\.\d{2}[+-]?$")
-
-    # ---------------- HELPERS ----------------
-    def parse_money(t: str) -> float:
-        neg = t.endswith("-")
-        pos = t.endswith("+")
-        t = t[:-1] if neg or pos else t
-        v = float(t.replace(",", ""))
-        return -v if neg else v
-
-    def norm_date(t: str) -> str:
-        return datetime.strptime(t, "%d-%m-%Y").strftime("%Y-%m-%d")
+    owns_doc = not isinstance(pdf_input, fitz.Document)
+    doc = open_doc(pdf_input) if owns_doc else pdf_input
 
     # ==========================================================
     # OPENING BALANCE (SAME LINE, X-AXIS BASED)
     # ==========================================================
     opening_balance = None
-    first_page = doc[0]
-    words = first_page.get_text("words")
+    # Word extraction is the costly pass: do it once for page 1
+    # and reuse the same list for its transaction rows below
+    first_words = doc[0].get_text("words")
 
-    rows = [{
-        "x": w[0],
-        "y": round(w[1], 1),
-        "text": w[4].strip()
-    } for w in words if w[4].strip()]
+    rows = [
+        (round(w[1], 1), w[0], w[4].strip())
+        for w in first_words if w[4].strip()
+    ]
 
-    for r in rows:
-        text = r["text"].upper()
+    for y_ref, x_ref, text in rows:
+        text = text.upper()
         if "BEGINNING" in text and "BALANCE" in text:
-            y_ref = r["y"]
-            x_ref = r["x"]
-
             same_line_money = [
                 w for w in rows
-                if abs(w["y"] - y_ref) <= 1.5
-                and w["x"] > x_ref
-                and MONEY_RE.match(w["text"])
+                if abs(w[0] - y_ref) <= 1.5
+                and w[1] > x_ref
+                and MONEY_RE.match(w[2])
             ]
 
             if same_line_money:
-                same_line_money.sort(key=lambda w: w["x"])
-                opening_balance = parse_money(same_line_money[-1]["text"])
+                same_line_money.sort(key=BY_X)
+                opening_balance = parse_cents(same_line_money[-1][2])
             break
 
     # ==========================================================
-    # TRANSACTION PARSER
+    # TRANSACTION ROWS (split across processes for long PDFs)
+    # ==========================================================
+    page_count = len(doc)
+    workers = page_workers(page_count, workers)
+
+    rows = parse_page_rows(first_words, 1)
+    if workers > 1:
+        rows.extend(map_page_ranges(
+            partial(_parse_page_range, doc.tobytes()),
+            range(2, page_count + 1),
+            workers,
+        ))
+    else:
+        for page_number in range(2, page_count + 1):
+            words = doc[page_number - 1].get_text("words")
+            rows.extend(parse_page_rows(words, page_number))
+
+    if owns_doc:
+        doc.close()
+
+    # ==========================================================
+    # DEBIT / CREDIT FROM BALANCE MOVEMENT (sequential)
     # ==========================================================
     transactions = []
     previous_balance = opening_balance
 
-    for page_index, page in enumerate(doc):
-        words = page.get_text("words")
-
-        rows = [{
-            "x": w[0],
-            "y": round(w[1], 1),
-            "text": w[4].strip()
-        } for w in words if w[4].strip()]
-
-        rows.sort(key=lambda r: (r["y"], r["x"]))
-        used_y = set()
-
-        for r in rows:
-            if not DATE_RE.match(r["text"]):
-                continue
-
-            y_key = r["y"]
-            if y_key in used_y:
-                continue
-
-            date_iso = norm_date(r["text"])
-
-            line = [w for w in rows if abs(w["y"] - y_key) <= 1.5]
-            line.sort(key=lambda w: w["x"])
-
-            description = []
-            money_vals = []
-
-            for w in line:
-                if w["text"] == r["text"]:
-                    continue
-                if MONEY_RE.match(w["text"]):
-                    money_vals.append(w)
-                else:
-                    if not w["text"].isdigit():
-                        description.append(w["text"])
-
-            if not money_vals:
-                continue
+    for date_iso, description, balance, page_number in rows:
+        debit = credit = 0
+        if previous_balance is not None:
+            delta = balance - previous_balance
+            if delta > 0:
+                credit = delta
+            elif delta < 0:
+                debit = -delta
+
+        transactions.append({
+            "date": date_iso,
+            "description": description,
+            "debit": debit / 100,
+            "credit": credit / 100,
+            "balance": balance / 100,
+            "page": page_number,
+            "bank": "RHB Bank",
+            "source_file": source_filename
+        })
+
+        previous_balance = balance
 
-            # Rightmost money = balance
-            balance = parse_money(max(money_vals, key=lambda m: m["x"])["text"])
-
-            debit = credit = 0.0
-            if previous_balance is not None:
-                delta = round(balance - previous_balance, 2)
-                if delta > 0:
-                    credit = delta
-                elif delta < 0:
-                    debit = abs(delta)
-
-            transactions.append({
-                "date": date_iso,
-                "description": " ".join(description)[:200],
-                "debit": round(debit, 2),
-                "credit": round(credit, 2),
-                "balance": round(balance, 2),
-                "page": page_index + 1,
-                "bank": "RHB Bank",
-                "source_file": source_filename
-            })
-
-            previous_balance = balance
-            used_y.add(y_key)
-
-    doc.close()
     return transactions
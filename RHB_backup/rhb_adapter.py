@@ -1,47 +1,132 @@
 import re
-from datetime import datetime
+from functools import partial
+from io import BytesIO
+from itertools import groupby
 
-def parse_transactions_rhb(pdf, source_filename):
+import fitz  # PyMuPDF
+import pdfplumber
+
+from page_pool import map_page_ranges, page_workers
+from pdf_pages import page_words, pdf_to_bytes
+from statement_text import DROP_COMMAS, norm_date
+
+# ---------------- REGEX ----------------
+DATE_RE = re.compile(r"^\d{2}-\d{2}-\d{4}$")
+# Matches money like 1,234.56 or 1,234.56-
+MONEY_RE = re.compile(r"^\d{1,3}(?:,\d{3})*\.\d{2}[+-]?$")
+
+
+# ---------------- HELPERS ----------------
+def parse_money(t: str) -> float:
+    if not t: return 0.0
+    t = t.strip()
+    neg = t.endswith("-")
+    # Remove suffix and commas
+    clean_t = t[:-1] if neg or t.endswith("+") else t
+    try:
+        v = float(clean_t.translate(DROP_COMMAS))
+        return -v if neg else v
+    except ValueError:
+        return 0.0
+
+
+# ==========================================================
+# PER-PAGE ROWS (no cross-page state)
+# ==========================================================
+def parse_page_rows(words, page_number):
     """
-    Parses RHB transactions using a pdfplumber object.
-    Fixes the missing first credit by accurately locating the 'Beginning Balance'.
+    (date, description, balance, page) for each dated line of one page.
+    Debit/credit need the previous balance, so they are worked out
+    afterwards and pages can be parsed independently.
     """
-    # ---------------- REGEX ----------------
-    DATE_RE = re.compile(r"^\d{2}-\d{2}-\d{4}$")
-    # Matches money like 1,234.56 or 1,234.56-
-    MONEY_RE = re.compile(r"^\d{1,3}(?:,\d{3})*\.\d{2}[+-]?$")
-
-    # ---------------- HELPERS ----------------
-    def parse_money(t: str) -> float:
-        if not t: return 0.0
-        t = t.strip()
-        neg = t.endswith("-")
-        # Remove suffix and commas
-        clean_t = t[:-1] if neg or t.endswith("+") else t
-        try:
-            v = float(clean_t.replace(",", ""))
-            return -v if neg else v
-        except ValueError:
-            return 0.0
-
-    def norm_date(t: str) -> str:
-        return datetime.strptime(t, "%d-%m-%Y").strftime("%Y-%m-%d")
+    rows = []
+
+    # Group words by line (using 'top' coordinate): one sort into
+    # reading order, then consecutive runs of the same rounded top
+    words = sorted(words, key=lambda w: (round(w['top'], 1), w['x0']))
+
+    for _, line_words in groupby(words, key=lambda w: round(w['top'], 1)):
+        line = list(line_words)
+        first_word = line[0]['text'].strip()
+
+        if not DATE_RE.match(first_word):
+            continue
+
+        date_iso = norm_date(first_word)
+
+        # Extract values from line. Words run left to right, so the
+        # last money string seen is the rightmost one: the balance in
+        # RHB statements. No list of amounts is kept.
+        description_parts = []
+        balance_text = None
+
+        for w in line[1:]:
+            txt = w['text'].strip()
+            # MONEY_RE needs a "."; a substring test rules out most
+            # description words before the regex engine is entered
+            if "." in txt and MONEY_RE.match(txt):
+                balance_text = w['text']
+            elif not txt.isdigit():
+                description_parts.append(txt)
+
+        if balance_text is None:
+            continue
+
+        rows.append((
+            date_iso,
+            " ".join(description_parts)[:200],
+            parse_money(balance_text),
+            page_number
+        ))
+
+    return rows
 
+
+def _parse_page_range(pdf_bytes, use_fitz, page_numbers):
+    # Worker: page objects don't pickle, so reopen the PDF from bytes
+    if use_fitz:
+        pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+        pages = [pdf[n - 1] for n in page_numbers]
+    else:
+        pdf = pdfplumber.open(BytesIO(pdf_bytes), pages=page_numbers)
+        pages = pdf.pages
+
+    try:
+        rows = []
+        for page_number, page in zip(page_numbers, pages):
+            rows.extend(parse_page_rows(page_words(page), page_number))
+        return rows
+    finally:
+        pdf.close()
+
+
+def parse_transactions_rhb(pdf, source_filename, workers=None):
+    """
+    Parses RHB transactions from a pdfplumber PDF or an open
+    fitz.Document (much faster word extraction); the caller closes it.
+    Fixes the missing first credit by accurately locating the 'Beginning Balance'.
+    `workers` goes to page_pool.page_workers for pages 2..N.
+    """
     # ==========================================================
     # STEP 1: FIND OPENING BALANCE
     # ==========================================================
     opening_balance = None
-    first_page = pdf.pages[0]
-    words = first_page.extract_words()
-    
+    pages = pdf if isinstance(pdf, fitz.Document) else pdf.pages
+    # Word extraction is the costly pass: do it once for page 1
+    # and reuse the same list in the transaction loop below
+    first_words = page_words(pages[0])
+
     # Sort words to reconstruct lines
-    words.sort(key=lambda w: (round(w['top'], 1), w['x0']))
+    words = sorted(first_words, key=lambda w: (round(w['top'], 1), w['x0']))
 
-    for i, w in enumerate(words):
-        text = w['text'].upper()
+    # Uppercase each word once; the keyword test and the 5-word
+    # context window below both read from this list
+    upper_texts = [w['text'].upper() for w in words]
+
+    for i, text in enumerate(upper_texts):
         if "BEGINNING" in text:
             # Check context for "BEGINNING BALANCE"
-            context = " ".join([word['text'].upper() for word in words[i:i+5]])
+            context = " ".join(upper_texts[i:i+5])
             if "BEGINNING BALANCE" in context:
                 # Look ahead for the first money string (the balance amount)
                 for search_idx in range(i, min(i + 15, len(words))):
@@ -53,68 +138,54 @@ def parse_transactions_rhb(pdf, source_filename):
                     break
 
     # ==========================================================
-    # STEP 2: TRANSACTION PARSER
+    # STEP 2: TRANSACTION ROWS (pages 2..N optionally in parallel)
+    # ==========================================================
+    page_count = len(pages)
+    workers = page_workers(page_count, workers)
+
+    rows = parse_page_rows(first_words, 1)
+    if workers > 1:
+        rows.extend(map_page_ranges(
+            partial(
+                _parse_page_range, pdf_to_bytes(pdf),
+                isinstance(pdf, fitz.Document),
+            ),
+            range(2, page_count + 1),
+            workers,
+        ))
+    else:
+        for page_number in range(2, page_count + 1):
+            page = pages[page_number - 1]
+            rows.extend(parse_page_rows(page_words(page), page_number))
+
+    # ==========================================================
+    # STEP 3: DEBIT / CREDIT FROM BALANCE MOVEMENT (sequential)
     # ==========================================================
     transactions = []
     previous_balance = opening_balance
 
-    for page in pdf.pages:
-        page_words = page.extract_words()
-        # Group words by line (using 'top' coordinate)
-        lines_dict = {}
-        for w in page_words:
-            y = round(w['top'], 1)
-            lines_dict.setdefault(y, []).append(w)
-        
-        sorted_y = sorted(lines_dict.keys())
-
-        for y in sorted_y:
-            line = sorted(lines_dict[y], key=lambda w: w['x0'])
-            first_word = line[0]['text'].strip()
-
-            if not DATE_RE.match(first_word):
-                continue
-
-            date_iso = norm_date(first_word)
-            
-            # Extract values from line
-            description_parts = []
-            money_vals = []
-            
-            for w in line[1:]:
-                txt = w['text'].strip()
-                if MONEY_RE.match(txt):
-                    money_vals.append(w)
-                elif not txt.isdigit():
-                    description_parts.append(txt)
-
-            if not money_vals:
-                continue
-
-            # Rightmost money is always the balance in RHB statements
-            balance_text = max(money_vals, key=lambda m: m['x0'])['text']
-            balance = parse_money(balance_text)
-
-            debit = credit = 0.0
-            if previous_balance is not None:
-                delta = round(balance - previous_balance, 2)
-                if delta > 0:
-                    credit = delta
-                elif delta < 0:
-                    debit = abs(delta)
-
-            transactions.append({
-                "date": date_iso,
-                "description": " ".join(description_parts)[:200],
-                "debit": round(debit, 2),
-                "credit": round(credit, 2),
-                "balance": round(balance, 2),
-                "page": page.page_number,
-                "bank": "RHB Bank",
-                "source_file": source_filename
-            })
-            
-            previous_balance = balance
+    # Balances come from 2-decimal strings and delta is rounded once
+    # here, so the output values need no further round() calls
+    for date_iso, description, balance, page_number in rows:
+        debit = credit = 0.0
+        if previous_balance is not None:
+            delta = round(balance - previous_balance, 2)
+            if delta > 0:
+                credit = delta
+            elif delta < 0:
+                debit = abs(delta)
+
+        transactions.append({
+            "date": date_iso,
+            "description": description,
+            "debit": debit,
+            "credit": credit,
+            "balance": balance,
+            "page": page_number,
+            "bank": "RHB Bank",
+            "source_file": source_filename
+        })
+
+        previous_balance = balance
 
     return transactions
-    
@@ -200,30 +200,39 @@ def calculate_monthly_summary(transactions):
     df['credit'] = pd.to_numeric(df['credit'], errors='coerce').fillna(0)
     df['balance'] = pd.to_numeric(df['balance'], errors='coerce')
 
-    monthly_summary = []
-
-    for period, group in df.groupby('month_period', sort=True):
-
-        ending_balance = None
-        if not group['balance'].isna().all():
-            group_sorted = group.sort_values('date_parsed')
-            balances = group_sorted['balance'].dropna()
-            if not balances.empty:
-                ending_balance = round(balances.iloc[-1], 2)
-
-        monthly_summary.append({
-            'month': period,
-            'transaction_count': len(group),
-            'total_debit': round(group['debit'].sum(), 2),
-            'total_credit': round(group['credit'].sum(), 2),
-            'net_change': round(group['credit'].sum() - group['debit'].sum(), 2),
-            'ending_balance': ending_balance,
-            'lowest_balance': round(group['balance'].min(), 2) if not group['balance'].isna().all() else None,
-            'highest_balance': round(group['balance'].max(), 2) if not group['balance'].isna().all() else None,
-            'source_files': ', '.join(sorted(group['source_file'].unique())) if 'source_file' in group.columns else ''
-        })
-
-    return sorted(monthly_summary, key=lambda x: x['month'])
+    # Sort once (stable: same-day rows keep statement order), then every
+    # monthly figure is one grouped reduction instead of a Python loop
+    df = df.sort_values('date_parsed', kind='stable')
+    grouped = df.groupby('month_period', sort=True)
+
+    summary = grouped.agg(
+        transaction_count=('date_parsed', 'size'),
+        total_debit=('debit', 'sum'),
+        total_credit=('credit', 'sum'),
+        ending_balance=('balance', 'last'),
+        lowest_balance=('balance', 'min'),
+        highest_balance=('balance', 'max'),
+    )
+    summary['net_change'] = summary['total_credit'] - summary['total_debit']
+    summary = summary.round(2)
+
+    if 'source_file' in df.columns:
+        summary['source_files'] = grouped['source_file'].agg(
+            lambda files: ', '.join(sorted(files.unique()))
+        )
+    else:
+        summary['source_files'] = ''
+
+    summary = summary.reset_index().rename(columns={'month_period': 'month'})
+    summary = summary[[
+        'month', 'transaction_count', 'total_debit', 'total_credit',
+        'net_change', 'ending_balance', 'lowest_balance',
+        'highest_balance', 'source_files'
+    ]]
+
+    # Months without any balance report None, not NaN
+    summary = summary.astype(object).where(summary.notna(), None)
+    return summary.to_dict('records')
 
 
 # ---------------------------------------------------
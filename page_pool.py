@@ -0,0 +1,50 @@
+"""
+Split a statement's pages across worker processes.
+
+Page objects don't pickle, so each worker reopens the PDF from bytes
+and parses one contiguous range of pages; results come back in page
+order, ready for the sequential balance pass.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Below this many pages, process start-up costs more than it saves
+PARALLEL_MIN_PAGES = 8
+
+
+def page_workers(page_count, workers=None):
+    """
+    Processes to spread a `page_count`-page statement over: `workers`
+    (default: CPU count), or 1 (stay serial) for short statements.
+    """
+    if page_count < PARALLEL_MIN_PAGES:
+        return 1
+    return max(1, min(workers or os.cpu_count() or 1, page_count))
+
+
+def map_page_ranges(worker, page_numbers, workers):
+    """
+    Yield the items of worker(range_pages) for `workers` contiguous
+    slices of `page_numbers`, in page order. `worker` must pickle:
+    a module-level function or a functools.partial of one.
+
+    If the pool can't start or a worker process dies (no fork/spawn
+    in the host, OOM kill), the ranges not yet yielded are parsed in
+    this process instead, so the result is the same as a serial run.
+    """
+    page_numbers = list(page_numbers)
+    size = -(-len(page_numbers) // workers)
+    chunks = [
+        page_numbers[i:i + size] for i in range(0, len(page_numbers), size)
+    ]
+
+    done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as ex:
+            for items in ex.map(worker, chunks):
+                done += 1
+                yield from items
+    except (BrokenProcessPool, OSError):
+        for chunk in chunks[done:]:
+            yield from worker(chunk)
@@ -0,0 +1,29 @@
+"""
+Page helpers for parsers that take either a pdfplumber PDF or an
+open fitz.Document.
+"""
+import fitz  # PyMuPDF
+
+
+def page_words(page):
+    """
+    Word dicts with text/x0/x1/top. PyMuPDF's C extractor is much
+    faster than pdfplumber, so its tuples are mapped to the same shape.
+    """
+    if isinstance(page, fitz.Page):
+        return [
+            {"text": w[4], "x0": w[0], "x1": w[2], "top": w[1]}
+            for w in page.get_text("words")
+        ]
+    words = page.extract_words()
+    # Callers never come back to a page: free its char cache now
+    page.close()
+    return words
+
+
+def pdf_to_bytes(pdf):
+    """The PDF's raw bytes, for page_pool workers to reopen."""
+    if isinstance(pdf, fitz.Document):
+        return pdf.tobytes()
+    pdf.stream.seek(0)
+    return pdf.stream.read()
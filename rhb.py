@@ -1,8 +1,49 @@
+import datetime
 import re
 import fitz  # PyMuPDF
 import pdfplumber
-from datetime import datetime
+from functools import partial
 from io import BytesIO
+from operator import itemgetter
+
+from page_pool import map_page_ranges, page_workers
+
+
+# ======================================================
+# Patterns: compiled once at import, not per call / line
+# ======================================================
+# Text rows: day, month, then anything up to the trailing balance. One
+# search hands back all three instead of separate date/balance scans
+MONTHS = r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)"
+BALANCE = r"(-?\d{1,3}(?:,\d{3})*\.\d{2})\s*$"
+
+# The row patterns only capture these names, so a dict lookup and
+# date() stand in for strptime's format parsing on every transaction
+MONTH_NUMBERS = {
+    month: i
+    for i, month in enumerate(MONTHS.strip("()").split("|"), start=1)
+}
+
+# Islamic: "01 Jan", year from "Statement Period ... 24"
+ISLAMIC_ROW_RE = re.compile(r"(\d{1,2})\s+" + MONTHS + r".*?" + BALANCE)
+PERIOD_YEAR_RE = re.compile(r"Statement Period.*?(\d{2})", re.IGNORECASE)
+BF_CF_RE = re.compile(r"\bB/F\b|\bC/F\b")
+
+# Conventional: "01Jan", year from "Jan24"
+CONVENTIONAL_ROW_RE = re.compile(r"(\d{2})" + MONTHS + r".*?" + BALANCE)
+HEADER_YEAR_RE = re.compile(r"[A-Za-z]{3}(\d{2})")
+
+# Reflex: amounts with an optional trailing +/- sign
+MONEY_RE = re.compile(r"(?:\d{1,3}(?:,\d{3})*|\d)?\.\d{2}[+-]?")
+OPENING_BALANCE_RE = re.compile(r"([\d,]+\.\d{2})([+-])?")
+REFLEX_DATE_RE = re.compile(r"\b\d{2}-\d{2}-\d{4}\b")
+
+# str.translate tables: one C pass instead of chained str.replace calls
+DROP_COMMAS = str.maketrans("", "", ",")
+DROP_COMMAS_AND_SIGNS = str.maketrans("", "", ",+-")
+
+# Reflex words are (y, x, text) tuples: a C-level key for x order
+BY_X = itemgetter(1)
 
 
 # ======================================================
@@ -37,70 +78,135 @@ def _read_pdf_bytes(pdf_input):
     raise ValueError("Unable to read PDF bytes")
 
 
+# ======================================================
+# Helper: page text, split across processes for long PDFs
+# ======================================================
+def _page_text(page):
+    # Each page is read once: drop pdfplumber's cached chars/objects
+    # now instead of holding every page's until the PDF is closed
+    text = page.extract_text_simple() or ""
+    page.close()
+    return text
+
+
+def _extract_page_texts(pdf_bytes, page_numbers):
+    # Worker: pdfplumber pages don't pickle, so reopen just this range
+    with pdfplumber.open(BytesIO(pdf_bytes), pages=page_numbers) as pdf:
+        return [_page_text(page) for page in pdf.pages]
+
+
+def _page_texts(pdf_bytes, first_text, workers=None):
+    # Page 1 was already extracted for the header: reuse that text and
+    # only extract pages 2..N here
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        page_count = len(pdf.pages)
+        workers = page_workers(page_count, workers)
+        if workers == 1:
+            return [first_text] + [
+                _page_text(page) for page in pdf.pages[1:]
+            ]
+
+    return [first_text] + list(map_page_ranges(
+        partial(_extract_page_texts, pdf_bytes),
+        range(2, page_count + 1),
+        workers,
+    ))
+
+
+def _iso_date(year, month, day, raw):
+    """
+    YYYY-MM-DD, or `raw` unchanged when the numbers are not a real
+    date ("31-02-2024"): date() still validates what strptime did.
+    """
+    try:
+        return datetime.date(year, month, int(day)).isoformat()
+    except ValueError:
+        return raw
+
+
+def _movement(balance, previous_balance):
+    """
+    (debit, credit) for the move from `previous_balance` to `balance`;
+    both 0.0 when there is no previous balance yet.
+    """
+    if previous_balance is None:
+        return 0.0, 0.0
+    # Balances are parsed from 2-decimal text, so rounding the movement
+    # once is all the output needs
+    delta = round(balance - previous_balance, 2)
+    if delta < 0:
+        return abs(delta), 0.0
+    if delta > 0:
+        return 0.0, delta
+    return 0.0, 0.0
+
+
 # ======================================================
 # 1️⃣ RHB ISLAMIC — TEXT BASED
 # ======================================================
-def _parse_rhb_islamic_text(pdf_bytes, source_filename):
+def _parse_rhb_islamic_text(page_texts, source_filename):
     transactions = []
     previous_balance = None
 
-    balance_re = re.compile(r"(-?\d{1,3}(?:,\d{3})*\.\d{2})\s*$")
-    date_re = re.compile(r"(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)")
+    header = page_texts[0]
+    period_match = PERIOD_YEAR_RE.search(header)
+    if not period_match:
+        return []
 
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-        header = pdf.pages[0].extract_text() or ""
-        period_match = re.search(r"Statement Period.*?(\d{2})", header, re.IGNORECASE)
-        if not period_match:
-            return []
+    year = int("20" + period_match.group(1))
+
+    for page_index, text in enumerate(page_texts):
+        if not text:
+            continue
 
-        year = int("20" + period_match.group(1))
+        for line in text.split("\n"):
+            # Rows end in a balance ("...1,234.56"): headers, notes
+            # and wrapped descriptions fail this before any regex
+            tail = line.rstrip()
+            if len(tail) < 4 or tail[-3] != ".":
+                continue
 
-        for page_index, page in enumerate(pdf.pages):
-            text = page.extract_text()
-            if not text:
+            row = ISLAMIC_ROW_RE.search(line)
+            if not row:
                 continue
 
-            for line in text.split("\n"):
-                bal_match = balance_re.search(line)
-                date_match = date_re.search(line)
-                if not bal_match or not date_match:
-                    continue
-
-                balance = float(bal_match.group(1).replace(",", ""))
-
-                if re.search(r"\bB/F\b|\bC/F\b", line):
-                    previous_balance = balance
-                    continue
-
-                if previous_balance is None:
-                    previous_balance = balance
-                    continue
-
-                day, month = date_match.groups()
-                date_iso = datetime.strptime(
-                    f"{day} {month} {year}", "%d %b %Y"
-                ).strftime("%Y-%m-%d")
-
-                delta = balance - previous_balance
-                debit = abs(delta) if delta < 0 else 0.0
-                credit = delta if delta > 0 else 0.0
-
-                desc = re.sub(balance_re, "", line)
-                desc = desc.replace(date_match.group(0), "")
-                desc = re.sub(r"\s+", " ", desc).strip()
-
-                transactions.append({
-                    "date": date_iso,
-                    "description": desc,
-                    "debit": round(debit, 2),
-                    "credit": round(credit, 2),
-                    "balance": round(balance, 2),
-                    "page": page_index + 1,
-                    "bank": "RHB Islamic Bank",
-                    "source_file": source_filename
-                })
+            day, month, bal_text = row.groups()
+            balance = float(bal_text.translate(DROP_COMMAS))
 
+            # B/F / C/F rows carry the running balance only; the
+            # "/F" substring test keeps the regex off ordinary rows
+            if "/F" in line and BF_CF_RE.search(line):
                 previous_balance = balance
+                continue
+
+            if previous_balance is None:
+                previous_balance = balance
+                continue
+
+            date_iso = _iso_date(
+                year, MONTH_NUMBERS[month], day, f"{day} {month} {year}"
+            )
+
+            debit, credit = _movement(balance, previous_balance)
+
+            # The match already located date and balance: keep the
+            # text around the date, up to the balance, in one join
+            desc = " ".join(
+                (line[:row.start(1)] + line[row.end(2):row.start(3)]).split()
+            )
+
+            transactions.append({
+                "date": date_iso,
+                "description": desc,
+                "debit": debit,
+                "credit": credit,
+                "balance": balance,
+                "page": page_index + 1,
+                "bank": "RHB Islamic Bank",
+                "source_file": source_filename
+            })
+
+            previous_balance = balance
 
     return transactions
 
@@ -109,63 +215,60 @@ def _parse_rhb_islamic_text(pdf_bytes, source_filename):
 # 2️⃣ RHB CONVENTIONAL — TEXT BASED
 # ======================================================
 
-def _parse_rhb_conventional_text(pdf_bytes, source_filename):
+def _parse_rhb_conventional_text(page_texts, source_filename):
     transactions = []
     previous_balance = None
 
-    balance_re = re.compile(r"(-?\d{1,3}(?:,\d{3})*\.\d{2})\s*$")
-    date_re = re.compile(r"(\d{2})(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)")
+    header = page_texts[0]
+    ym = HEADER_YEAR_RE.search(header)
+    if not ym:
+        return []
 
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-        header = pdf.pages[0].extract_text() or ""
-        ym = re.search(r"[A-Za-z]{3}(\d{2})", header)
-        if not ym:
-            return []
+    year = int("20" + ym.group(1))
 
-        year = int("20" + ym.group(1))
+    for page_index, text in enumerate(page_texts):
+        if not text:
+            continue
 
-        for page_index, page in enumerate(pdf.pages):
-            text = page.extract_text()
-            if not text:
+        for line in text.split("\n"):
+            # Same cheap balance-suffix test as the Islamic parser
+            tail = line.rstrip()
+            if len(tail) < 4 or tail[-3] != ".":
                 continue
 
-            for line in text.split("\n"):
-                bal = balance_re.search(line)
-                date = date_re.search(line)
-                if not bal or not date:
-                    continue
-
-                balance = float(bal.group(1).replace(",", ""))
-
-                if previous_balance is None:
-                    previous_balance = balance
-                    continue
-
-                day, month = date.groups()
-                date_iso = datetime.strptime(
-                    f"{day}{month}{year}", "%d%b%Y"
-                ).strftime("%Y-%m-%d")
-
-                delta = balance - previous_balance
-                debit = abs(delta) if delta < 0 else 0.0
-                credit = delta if delta > 0 else 0.0
-
-                desc = re.sub(balance_re, "", line)
-                desc = desc.replace(date.group(0), "")
-                desc = re.sub(r"\s+", " ", desc).strip()
-
-                transactions.append({
-                    "date": date_iso,
-                    "description": desc,
-                    "debit": round(debit, 2),
-                    "credit": round(credit, 2),
-                    "balance": round(balance, 2),
-                    "page": page_index + 1,
-                    "bank": "RHB Bank",
-                    "source_file": source_filename
-                })
+            row = CONVENTIONAL_ROW_RE.search(line)
+            if not row:
+                continue
 
+            day, month, bal_text = row.groups()
+            balance = float(bal_text.translate(DROP_COMMAS))
+
+            if previous_balance is None:
                 previous_balance = balance
+                continue
+
+            date_iso = _iso_date(
+                year, MONTH_NUMBERS[month], day, f"{day}{month}{year}"
+            )
+
+            debit, credit = _movement(balance, previous_balance)
+
+            desc = " ".join(
+                (line[:row.start(1)] + line[row.end(2):row.start(3)]).split()
+            )
+
+            transactions.append({
+                "date": date_iso,
+                "description": desc,
+                "debit": debit,
+                "credit": credit,
+                "balance": balance,
+                "page": page_index + 1,
+                "bank": "RHB Bank",
+                "source_file": source_filename
+            })
+
+            previous_balance = balance
 
     return transactions
 
@@ -173,35 +276,162 @@ def _parse_rhb_conventional_text(pdf_bytes, source_filename):
 # ======================================================
 # 3️⃣ RHB REFLEX — LAYOUT BASED (FIXED VERSION)
 # ======================================================
-def _parse_rhb_reflex_layout(pdf_bytes, source_filename):
-    import re
-    import fitz
-    import pdfplumber
-    from io import BytesIO
-    from datetime import datetime
+def _is_reflex_date(text):
+    # Same as ^\d{2}-\d{2}-\d{4}$ with plain string methods (in C);
+    # runs on every word of every page, so skip the regex engine
+    return (
+        len(text) == 10 and text[2] == "-" and text[5] == "-"
+        and text[:2].isdecimal() and text[3:5].isdecimal()
+        and text[6:].isdecimal()
+    )
+
+
+def _norm_reflex_date(text):
+    # DD-MM-YYYY digits already checked by _is_reflex_date
+    return _iso_date(int(text[6:]), int(text[3:5]), text[:2], text)
+
+
+def _reflex_page_rows(words, page_number):
+    """
+    (date, description, balance, page) for each dated line of one page.
+    Debit/credit need the previous balance, so they are worked out
+    afterwards and pages can be parsed independently.
+    """
+    # Cover / summary / notes pages carry no dated rows: skip the
+    # row tuples, sort and Y index for them entirely
+    if not any(_is_reflex_date(w[4].strip()) for w in words):
+        return []
     
-    transactions = []
+    # (y, x, text) tuples: a plain sort gives reading order and
+    # each word costs one small tuple instead of a three-key dict
+    rows = [
+        (round(w[1], 1), w[0], w[4].strip())
+        for w in words if w[4].strip()
+    ]
     
-    DATE_RE = re.compile(r"^\d{2}-\d{2}-\d{4}$")
-    # Updated MONEY_RE to optionally capture +/- signs
-    MONEY_RE = re.compile(r"(?:\d{1,3}(?:,\d{3})*|\d)?\.\d{2}[+-]?")
+    rows.sort()
+    # Rows are visited in y order, so a y already taken can only be
+    # the most recent one: one float compare instead of a set
+    last_y = None
+    page_rows = []
+    
+    # Index words by integer Y once per page so each date row only
+    # scans nearby buckets instead of every word on the page
+    y_buckets = {}
+    for w in rows:
+        y_buckets.setdefault(int(w[0]), []).append(w)
+    
+    for y, _, date_text in rows:
+        if not _is_reflex_date(date_text):
+            continue
+        
+        if y == last_y:
+            continue
+        
+        # |dy| <= 1.5 never reaches beyond two buckets either side
+        line = [
+            w
+            for key in range(int(y) - 2, int(y) + 3)
+            for w in y_buckets.get(key, ())
+            if abs(w[0] - y) <= 1.5
+        ]
+        line.sort(key=BY_X)
+        
+        # One pass splits the line into amounts and description
+        # words, instead of re-walking it with `w not in money`.
+        # Every amount has a ".": words without one skip the regex
+        money = []
+        description = []
+        for _, _, text in line:
+            if "." in text and MONEY_RE.match(text):
+                money.append(text)
+            elif not _is_reflex_date(text) and not text.isdigit():
+                description.append(text)
+        
+        if len(money) < 2:
+            continue
+        
+        # ------------------------------
+        # Balance (FIXED: handles both + and -)
+        # ------------------------------
+        bal_text = money[-1]
+        
+        # Check for negative (overdraft)
+        is_negative = bal_text.endswith("-")
+        # Check for positive (some statements mark with +)
+        is_positive = bal_text.endswith("+")
+        
+        # Remove commas and all signs in one pass and convert to float
+        bal_val = float(bal_text.translate(DROP_COMMAS_AND_SIGNS))
+        
+        # Apply sign
+        if is_negative:
+            bal_val = -bal_val
+        # If is_positive or no sign, keep positive (default)
+        
+        page_rows.append((
+            _norm_reflex_date(date_text),
+            " ".join(description)[:200],
+            bal_val,
+            page_number
+        ))
+        last_y = y
     
-    def norm_date(text):
-        return datetime.strptime(text, "%d-%m-%Y").strftime("%Y-%m-%d")
+    return page_rows
+
+
+def _reflex_page_range(pdf_bytes, page_numbers):
+    # Worker: fitz pages don't pickle, so reopen the PDF from bytes
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        rows = []
+        for page_number in page_numbers:
+            words = doc[page_number - 1].get_text("words")
+            rows.extend(_reflex_page_rows(words, page_number))
+        return rows
+    finally:
+        doc.close()
+
+
+def _reflex_rows(pdf_bytes, workers=None):
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_count = len(doc)
+        workers = page_workers(page_count, workers)
+        if workers == 1:
+            rows = []
+            for page_index, page in enumerate(doc):
+                rows.extend(
+                    _reflex_page_rows(page.get_text("words"), page_index + 1)
+                )
+            return rows
+
+    return list(map_page_ranges(
+        partial(_reflex_page_range, pdf_bytes),
+        range(1, page_count + 1),
+        workers,
+    ))
+
+
+def _parse_rhb_reflex_layout(pdf_bytes, source_filename, first_text=None,
+                             workers=None):
+    transactions = []
     
     # ==================================================
     # 1️⃣ Extract OPENING BALANCE first (CRITICAL) - FIXED
     # ==================================================
     def extract_opening_balance():
         with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
+            for page_index, page in enumerate(pdf.pages):
+                if page_index == 0 and first_text is not None:
+                    text = first_text
+                else:
+                    text = _page_text(page)
                 if "Beginning Balance" in text:
                     # NEW: Handle both positive and negative balances
                     # Matches: "251,613.85", "251,613.85+", or "845,425.30-"
-                    m = re.search(r"([\d,]+\.\d{2})([+-])?", text)
+                    m = OPENING_BALANCE_RE.search(text)
                     if m:
-                        amount = float(m.group(1).replace(",", ""))
+                        amount = float(m.group(1).translate(DROP_COMMAS))
                         # If there's a minus sign, make it negative
                         if m.group(2) == "-":
                             amount = -amount
@@ -214,91 +444,27 @@ def _parse_rhb_reflex_layout(pdf_bytes, source_filename):
     # ==================================================
     # 2️⃣ Parse TRANSACTIONS using layout - FIXED
     # ==================================================
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    
-    for page_index, page in enumerate(doc):
-        words = page.get_text("words")
-        
-        rows = [{
-            "x": w[0],
-            "y": round(w[1], 1),
-            "text": w[4].strip()
-        } for w in words if w[4].strip()]
+    # Pages are independent up to here (split across processes for
+    # long statements); only the balance movement below is sequential
+    for date_iso, description, bal_val, page_number in _reflex_rows(pdf_bytes, workers):
+        # ------------------------------
+        # DR / CR by BALANCE MOVEMENT
+        # ------------------------------
+        debit, credit = _movement(bal_val, previous_balance)
         
-        rows.sort(key=lambda r: (r["y"], r["x"]))
-        used_y = set()
+        transactions.append({
+            "date": date_iso,
+            "description": description,
+            "debit": debit,
+            "credit": credit,
+            "balance": bal_val,
+            "page": page_number,
+            "bank": "RHB Bank",
+            "source_file": source_filename
+        })
         
-        for r in rows:
-            if not DATE_RE.match(r["text"]):
-                continue
-            
-            y = r["y"]
-            if y in used_y:
-                continue
-            
-            line = [w for w in rows if abs(w["y"] - y) <= 1.5]
-            line.sort(key=lambda w: w["x"])
-            
-            money = [w for w in line if MONEY_RE.match(w["text"])]
-            if len(money) < 2:
-                continue
-            
-            bal_word = money[-1]
-            
-            # ------------------------------
-            # Balance (FIXED: handles both + and -)
-            # ------------------------------
-            bal_text = bal_word["text"].replace(",", "")
-            
-            # Check for negative (overdraft)
-            is_negative = bal_text.endswith("-")
-            # Check for positive (some statements mark with +)
-            is_positive = bal_text.endswith("+")
-            
-            # Remove all signs and convert to float
-            bal_val = float(bal_text.replace("-", "").replace("+", ""))
-            
-            # Apply sign
-            if is_negative:
-                bal_val = -bal_val
-            # If is_positive or no sign, keep positive (default)
-            
-            # ------------------------------
-            # DR / CR by BALANCE MOVEMENT
-            # ------------------------------
-            debit = credit = 0.0
-            if previous_balance is not None:
-                delta = bal_val - previous_balance
-                if delta < 0:
-                    debit = abs(delta)
-                elif delta > 0:
-                    credit = delta
-            
-            # ------------------------------
-            # Description
-            # ------------------------------
-            description = [
-                w["text"] for w in line
-                if w not in money
-                and not DATE_RE.match(w["text"])
-                and not w["text"].isdigit()
-            ]
-            
-            transactions.append({
-                "date": norm_date(r["text"]),
-                "description": " ".join(description)[:200],
-                "debit": round(debit, 2),
-                "credit": round(credit, 2),
-                "balance": round(bal_val, 2),
-                "page": page_index + 1,
-                "bank": "RHB Bank",
-                "source_file": source_filename
-            })
-            
-            previous_balance = bal_val
-            used_y.add(y)
+        previous_balance = bal_val
     
-    doc.close()
     return transactions
 
 
@@ -335,20 +501,54 @@ def _parse_rhb_reflex_layout(pdf_bytes, source_filename):
 RESULT: Now works for BOTH overdraft and regular accounts!
 """
 
-def parse_transactions_rhb(pdf_input, source_filename):
+def _layout_parsers(first_text):
+    """
+    Parsers to try, most likely layout first, picked from page 1 text.
+    The Islamic parser needs "Statement Period" and returns nothing
+    without it; Reflex pages print DD-MM-YYYY dates, so those skip the
+    full-text conventional pass unless it is the only option left.
+    """
+    if PERIOD_YEAR_RE.search(first_text):
+        return (
+            _parse_rhb_islamic_text,
+            _parse_rhb_conventional_text,
+            _parse_rhb_reflex_layout,
+        )
+    if REFLEX_DATE_RE.search(first_text):
+        return (_parse_rhb_reflex_layout, _parse_rhb_conventional_text)
+    return (_parse_rhb_conventional_text, _parse_rhb_reflex_layout)
+
+
+def parse_transactions_rhb(pdf_input, source_filename, workers=None):
+    """
+    Statements of page_pool.PARALLEL_MIN_PAGES or more pages are split
+    across `workers` processes (default: CPU count); workers=1 stays
+    serial.
+    """
     pdf_bytes = _read_pdf_bytes(pdf_input)
 
-    for parser in (
-        _parse_rhb_islamic_text,
-        _parse_rhb_conventional_text,
-        _parse_rhb_reflex_layout,
-    ):
+    # Page 1 text holds every layout's year / opening balance: extract
+    # it once here instead of once per parser tried
+    try:
+        with pdfplumber.open(BytesIO(pdf_bytes), pages=[1]) as pdf:
+            first_text = pdf.pages[0].extract_text_simple() or ""
+    except Exception:
+        return []
+
+    page_texts = None
+    for parser in _layout_parsers(first_text):
         try:
-            tx = parser(pdf_bytes, source_filename)
+            if parser is _parse_rhb_reflex_layout:
+                tx = parser(pdf_bytes, source_filename, first_text, workers)
+            else:
+                # Both text parsers read the same page text: extract it
+                # (and start any process pool) once, not per parser
+                if page_texts is None:
+                    page_texts = _page_texts(pdf_bytes, first_text, workers)
+                tx = parser(page_texts, source_filename)
             if tx:
                 return tx
         except Exception:
             continue
 
     return []
-
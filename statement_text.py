@@ -0,0 +1,15 @@
+"""
+Text helpers shared by the RHB_backup parsers.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+# str.translate table: strips thousands separators in one C pass
+DROP_COMMAS = str.maketrans("", "", ",")
+
+
+# A statement repeats the same few dozen dates; strptime is slow,
+# so each distinct DD-MM-YYYY string is converted once
+@lru_cache(maxsize=1024)
+def norm_date(t: str) -> str:
+    return datetime.strptime(t, "%d-%m-%Y").strftime("%Y-%m-%d")
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import page_pool
+
+
+def squares(page_numbers):
+    return [n * n for n in page_numbers]
+
+
+def squares_outside_workers(page_numbers):
+    # Kill any worker process outright, as an OOM kill would
+    if os.getpid() != int(os.environ["PAGE_POOL_TEST_PID"]):
+        os._exit(1)
+    return squares(page_numbers)
+
+
+def test_page_workers_stays_serial_for_short_statements():
+    assert page_pool.page_workers(page_pool.PARALLEL_MIN_PAGES - 1, 4) == 1
+    assert page_pool.page_workers(20, 4) == 4
+    assert page_pool.page_workers(page_pool.PARALLEL_MIN_PAGES, 99) == (
+        page_pool.PARALLEL_MIN_PAGES
+    )
+
+
+def test_map_page_ranges_keeps_page_order():
+    assert list(page_pool.map_page_ranges(squares, range(1, 11), 3)) == [
+        n * n for n in range(1, 11)
+    ]
+
+
+def test_map_page_ranges_runs_serially_when_pool_cannot_start(monkeypatch):
+    def no_processes(*args, **kwargs):
+        raise OSError("no fork")
+
+    monkeypatch.setattr(page_pool, "ProcessPoolExecutor", no_processes)
+    assert list(page_pool.map_page_ranges(squares, range(1, 11), 3)) == [
+        n * n for n in range(1, 11)
+    ]
+
+
+def test_map_page_ranges_reruns_ranges_of_a_broken_pool(monkeypatch):
+    monkeypatch.setenv("PAGE_POOL_TEST_PID", str(os.getpid()))
+    assert list(
+        page_pool.map_page_ranges(squares_outside_workers, range(1, 11), 3)
+    ) == [n * n for n in range(1, 11)]
@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import rhb
+
+
+def test_iso_date_valid():
+    assert rhb._iso_date(2024, 1, "5", "5 Jan 2024") == "2024-01-05"
+    assert rhb._iso_date(2024, 2, "29", "29Feb2024") == "2024-02-29"
+
+
+def test_iso_date_invalid_keeps_source_text():
+    assert rhb._iso_date(2024, 2, "31", "31-02-2024") == "31-02-2024"
+    assert rhb._iso_date(2023, 2, "29", "29 Feb 2023") == "29 Feb 2023"
+
+
+def test_layout_parsers_statement_period_tries_islamic_first():
+    assert rhb._layout_parsers("Statement Period 01 Jan 24 - 31 Jan 24") == (
+        rhb._parse_rhb_islamic_text,
+        rhb._parse_rhb_conventional_text,
+        rhb._parse_rhb_reflex_layout,
+    )
+
+
+def test_layout_parsers_reflex_dates_try_reflex_first():
+    assert rhb._layout_parsers("Beginning Balance 01-01-2024 1,000.00") == (
+        rhb._parse_rhb_reflex_layout,
+        rhb._parse_rhb_conventional_text,
+    )
+
+
+def test_layout_parsers_default_tries_conventional_first():
+    assert rhb._layout_parsers("ACCOUNT STATEMENT Jan24") == (
+        rhb._parse_rhb_conventional_text,
+        rhb._parse_rhb_reflex_layout,
+    )
+
+
+def test_movement_splits_rounded_delta():
+    assert rhb._movement(900.10, 1000.30) == (100.2, 0.0)
+    assert rhb._movement(1000.30, 900.10) == (0.0, 100.2)
+    assert rhb._movement(0.3, 0.1 + 0.2) == (0.0, 0.0)
+    assert rhb._movement(100.0, None) == (0.0, 0.0)
+
+
+def fitz_word(text, x0, y0):
+    return (x0, y0, x0 + 40, y0 + 8, text, 0, 0, 0)
+
+
+def test_reflex_page_rows_keeps_words_exactly_1_5pt_off_the_date():
+    words = [
+        fitz_word("01-02-2024", 10, 100.0),
+        fitz_word("TRANSFER", 80, 101.5),
+        fitz_word("LATE", 120, 101.6),
+        fitz_word("100.00", 300, 100.0),
+        fitz_word("1,000.00", 400, 98.5),
+    ]
+    assert rhb._reflex_page_rows(words, 3) == [
+        ("2024-02-01", "TRANSFER", 1000.0, 3)
+    ]
@@ -0,0 +1,55 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+# The backup modules import page_pool from the repo root
+sys.path[:0] = [ROOT, os.path.join(ROOT, "RHB_backup")]
+
+from RHB_islamic import build_column_index, classify_amounts, group_words_by_line
+
+
+def word(text, x0, top):
+    return {"text": text, "x0": x0, "x1": x0 + 30, "top": top}
+
+
+def amount(cents, x0, x1):
+    return (x0, x1, cents)
+
+
+def test_column_edges_are_inclusive():
+    edges, kind_by_slot = build_column_index((200, 260), (300, 360))
+    # x_mid lands exactly on the debit right edge and the credit left edge
+    nums = [amount(100, 250, 270), amount(900, 500, 530)]
+    assert classify_amounts(nums, edges, kind_by_slot) == (100, 0, 900)
+    nums = [amount(200, 290, 310), amount(900, 500, 530)]
+    assert classify_amounts(nums, edges, kind_by_slot) == (0, 200, 900)
+
+
+def test_debit_wins_overlap_in_credit_debit_layout():
+    # Credit printed left of Debit, with the padded ranges overlapping
+    edges, kind_by_slot = build_column_index((280, 340), (200, 300))
+    nums = [amount(300, 285, 295), amount(900, 500, 530)]
+    assert classify_amounts(nums, edges, kind_by_slot) == (300, 0, 900)
+    nums = [amount(400, 230, 250), amount(900, 500, 530)]
+    assert classify_amounts(nums, edges, kind_by_slot) == (0, 400, 900)
+
+
+# Date words and amounts on slightly different baselines, as seen on
+# real statements: 84.46 vs 84.66 rounds to different integer tops
+MIXED_BASELINE_WORDS = [
+    word("03", 20, 84.46), word("Jan", 40, 84.46), word("TRANSFER", 80, 84.46),
+    word("100.00", 215, 84.66), word("1,900.00", 420, 84.66),
+    word("05", 20, 101.49), word("Feb", 40, 101.49), word("DEPOSIT", 80, 101.49),
+    word("250.00", 315, 101.52), word("2,150.00", 420, 101.52),
+    word("07", 20, 118.80), word("Mar", 40, 118.80), word("FEE", 80, 118.80),
+    word("5.00", 215, 118.51), word("2,145.00", 420, 118.51),
+]
+
+
+def test_group_words_by_line_tolerates_mixed_baselines():
+    lines = group_words_by_line(MIXED_BASELINE_WORDS)
+    assert [" ".join(w["text"] for w in line) for line in lines] == [
+        "03 Jan TRANSFER 100.00 1,900.00",
+        "05 Feb DEPOSIT 250.00 2,150.00",
+        "07 Mar FEE 5.00 2,145.00",
+    ]